@@ -1,8 +1,7 @@
 import os
+from functools import lru_cache
+from typing import Literal
 from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
-
-load_dotenv()
 
 
 class Settings(BaseSettings):
@@ -30,6 +29,12 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
     GMAIL_SCOPE: str = "https://www.googleapis.com/auth/gmail.send"
     
+    # Queue Settings
+    # "memory" runs tasks in-process; "redis" enqueues via RQ over a pooled
+    # Redis connection (requires redis + rq to be installed)
+    QUEUE_BACKEND: Literal["memory", "redis"] = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
     # Logging Settings
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/certimate.log"
@@ -41,4 +46,15 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build the Settings singleton once per process.
+
+    pydantic-settings already reads env_file, so the explicit load_dotenv()
+    call was a duplicate parse of .env; caching the instance means reimports
+    and FastAPI dependencies share one parse instead of re-reading disk.
+    """
+    return Settings()
+
+
+settings = get_settings()
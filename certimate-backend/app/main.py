@@ -1,5 +1,12 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # pragma: no cover - optional dependency
+    BrotliMiddleware = None
 from app.routes import upload, generate, health, send, mapping
 from app.config import settings
 from app.utils.logger import setup_logging
@@ -19,7 +26,10 @@ def create_app() -> FastAPI:
         title=settings.API_TITLE,
         description="Certificate generation and management API",
         version=settings.API_VERSION,
-        debug=settings.DEBUG
+        debug=settings.DEBUG,
+        # orjson serializes response payloads several times faster than the
+        # stdlib json encoder FastAPI uses by default
+        default_response_class=ORJSONResponse
     )
 
     # CORS middleware configuration
@@ -32,12 +42,38 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Response compression: Brotli gives 20-30% smaller JSON payloads than
+    # gzip at lower CPU cost (quality=4). brotli-asgi falls back to gzip
+    # itself when the client doesn't send Accept-Encoding: br; if the
+    # package isn't installed we fall back to plain GZipMiddleware.
+    if BrotliMiddleware is not None:
+        app.add_middleware(BrotliMiddleware, quality=4, minimum_size=1000)
+    else:
+        app.add_middleware(GZipMiddleware, minimum_size=1000)
+
     # Include routers with API prefix
     app.include_router(upload.router, prefix="/api")
     app.include_router(generate.router, prefix="/api")
     app.include_router(send.router, prefix="/api")
     app.include_router(mapping.router, prefix="/api")
-    app.include_router(health.router)
+
+    # Health probes arrive many times per second and don't need compression
+    # or other heavyweight middleware; mounting them as a sub-app keeps
+    # every probe out of the outer app's middleware chain (middleware only
+    # wraps routes on the app it was added to). CORS stays, though — the
+    # frontend's healthCheck() calls /health/* cross-origin — and it costs
+    # one middleware frame only on health traffic. Paths are unchanged:
+    # /health/, /health/ready, /health/live.
+    health_app = FastAPI(default_response_class=ORJSONResponse)
+    health_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    health_app.include_router(health.router)
+    app.mount("/health", health_app)
 
     @app.get("/")
     async def root():
@@ -65,13 +101,21 @@ def create_app() -> FastAPI:
             "logs"
         )
         logger.info("Required directories created/verified")
-    
+
+        # Start async queue workers on the running event loop
+        from app.core.queue import email_q
+        await email_q.start()
+
     # Shutdown event
     @app.on_event("shutdown")
     async def shutdown_event():
         """Cleanup on shutdown"""
         logger.info("Shutting down CertiMate API...")
 
+        # Cancel async queue workers
+        from app.core.queue import email_q
+        await email_q.shutdown()
+
     return app
 
 
@@ -1,9 +1,24 @@
-from pydantic import BaseModel, Field, validator, EmailStr
+import time
+from functools import cached_property
+from pydantic import BaseModel, Field, computed_field, field_validator, EmailStr
 from typing import Optional, Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
-import re
 
+# Advisory timestamps (health probes, upload receipts, error envelopes)
+# don't need sub-second precision, so amortize the clock read and datetime
+# allocation to once per second instead of once per model instantiation.
+# Also replaces datetime.utcnow (naive, deprecated in 3.12) with an aware
+# UTC datetime.
+_ts_cache = {"t": 0, "dt": None}
+
+
+def _coarse_utcnow() -> datetime:
+    now = int(time.time())
+    if now != _ts_cache["t"] or _ts_cache["dt"] is None:
+        _ts_cache["t"] = now
+        _ts_cache["dt"] = datetime.now(timezone.utc)
+    return _ts_cache["dt"]
 
 class OutputFormat(str, Enum):
     """Supported output formats"""
@@ -14,28 +29,22 @@ class OutputFormat(str, Enum):
 
 class CertificateGenerateRequest(BaseModel):
     """Request schema for certificate generation"""
-    template_path: str = Field(..., min_length=1, description="Path to certificate template")
-    data: Dict[str, Any] = Field(..., min_items=1, description="Certificate data")
+    # The extension pattern runs in pydantic-core's Rust regex engine; the
+    # only Python-side work left is the whitespace strip below.
+    template_path: str = Field(
+        ...,
+        min_length=1,
+        pattern=r'(?i).+\.(pdf|docx|png|jpe?g)$',
+        description="Path to certificate template"
+    )
+    data: Dict[str, Any] = Field(..., min_length=1, description="Certificate data")
     output_format: OutputFormat = Field(OutputFormat.PDF, description="Output format")
     custom_fields: Optional[Dict[str, Any]] = Field(default=None, description="Custom fields")
-    
-    @validator('template_path')
-    def validate_template_path(cls, v):
-        if not v.strip():
-            raise ValueError('Template path cannot be empty')
-        # Basic file extension validation
-        allowed_extensions = ['.pdf', '.docx', '.png', '.jpg', '.jpeg']
-        if not any(v.lower().endswith(ext) for ext in allowed_extensions):
-            raise ValueError(f'Template must have one of these extensions: {allowed_extensions}')
-        return v.strip()
-    
-    @validator('data')
-    def validate_data(cls, v):
-        if not isinstance(v, dict):
-            raise ValueError('Data must be a dictionary')
-        if not v:
-            raise ValueError('Data cannot be empty')
-        return v
+
+    @field_validator('template_path', mode='before')
+    @classmethod
+    def strip_template_path(cls, v):
+        return v.strip() if isinstance(v, str) else v
 
 
 class CertificateStatus(str, Enum):
@@ -65,7 +74,7 @@ class ServiceStatus(str, Enum):
 class HealthResponse(BaseModel):
     """Health check response schema"""
     status: ServiceStatus = Field(..., description="Service health status")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Health check timestamp")
+    timestamp: datetime = Field(default_factory=_coarse_utcnow, description="Health check timestamp")
     service: Optional[str] = Field(default="certimate-api", description="Service name")
     version: Optional[str] = Field(default="1.0.0", description="Service version")
     uptime: Optional[float] = Field(default=None, description="Service uptime in seconds")
@@ -79,7 +88,7 @@ class FileUploadResponse(BaseModel):
     file_path: str = Field(..., description="File storage path")
     file_size: int = Field(..., description="File size in bytes")
     file_type: str = Field(..., description="MIME type")
-    upload_timestamp: datetime = Field(default_factory=datetime.utcnow, description="Upload timestamp")
+    upload_timestamp: datetime = Field(default_factory=_coarse_utcnow, description="Upload timestamp")
     checksum: Optional[str] = Field(default=None, description="File checksum for integrity")
 
 class JobStatus(str, Enum):
@@ -105,22 +114,33 @@ class JobResponse(BaseModel):
 
 class EmailSendRequest(BaseModel):
     """Email sending request schema"""
-    recipients: List[EmailStr] = Field(..., min_items=1, max_items=1000, description="List of recipient emails (auto-batched if >100)")
+    recipients: List[EmailStr] = Field(..., min_length=1, max_length=1000, description="List of recipient emails (batched via .batches)")
     subject: str = Field(..., min_length=1, max_length=200, description="Email subject")
     body_template: str = Field(..., min_length=1, description="Email body template")
     attachments: Optional[List[str]] = Field(default=None, description="List of attachment file paths")
     access_token: str = Field(..., description="Email service access token")
     batch_delay: Optional[int] = Field(default=30, ge=0, le=300, description="Delay between batches in seconds")
     
-    @validator('recipients')
-    def validate_and_batch_recipients(cls, v):
-        if len(v) > 1000:
+    @field_validator('recipients', mode='before')
+    @classmethod
+    def check_recipient_count(cls, v):
+        # Reject oversized payloads before the core runs up to 1000
+        # per-address EmailStr validations for nothing.
+        if isinstance(v, list) and len(v) > 1000:
             raise ValueError('Cannot send to more than 1000 recipients at once')
-        if len(v) <= 100:
-            return [v]  # Single batch
-        # Auto-split into batches of 100
-        batches = [v[i:i+100] for i in range(0, len(v), 100)]
-        return batches
+        return v
+
+    @computed_field
+    @cached_property
+    def batches(self) -> List[List[EmailStr]]:
+        """Recipients split into batches of 100, computed once on first use.
+
+        recipients stays the canonical flat list; the old validator rewrote
+        it to a list of batches, breaking the declared type and slicing on
+        every request whether or not the caller batched.
+        """
+        r = self.recipients
+        return [r[i:i + 100] for i in range(0, len(r), 100)]
 
 class EmailSendResponse(BaseModel):
     """Email sending response schema"""
@@ -136,16 +156,17 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Error description")
     details: Optional[Dict[str, Any]] = Field(default=None, description="Additional error details")
-    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Error timestamp")
+    timestamp: datetime = Field(default_factory=_coarse_utcnow, description="Error timestamp")
     request_id: Optional[str] = Field(default=None, description="Request tracking ID")
 
 class PaginationParams(BaseModel):
     """Pagination parameters schema"""
     page: int = Field(default=1, ge=1, description="Page number")
     size: int = Field(default=20, ge=1, le=100, description="Page size")
-    
-    @property
+
+    @cached_property
     def offset(self) -> int:
+        # page/size are immutable once validated, so compute once
         return (self.page - 1) * self.size
 
 class PaginatedResponse(BaseModel):
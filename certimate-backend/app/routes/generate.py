@@ -1,31 +1,103 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Response
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 import os
 import logging
 import uuid
+import orjson
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from app.core.queue import EnhancedQueue, q, _preload_rendering_libs
 from app.services.csv_service import CSVService
 from app.services.placeholder_advanced import AdvancedPlaceholderService
 from app.services.pdf_service import PDFService
 from app.services.zip_service import ZIPService
 from app.config import settings
 from app.utils.logger import CSVAuditLogger
-from app.utils.metadata import UploadMetadata
+from app.utils.metadata import get_upload_metadata
 from app.services.job_service import JobService
+from app.tasks.generation_tasks import generate_batch_task, _render_preview_row, _safe_filename_part
 from app.models.schemas import CertificateGenerateRequest, CertificateResponse, CertificateStatus, JobResponse, JobStatus
 
 logger = logging.getLogger(__name__)
 audit_logger = CSVAuditLogger()
 
-router = APIRouter(prefix="/generate", tags=["generate"])
+# Explicit ORJSONResponse here (not just the app-level default) so these
+# endpoints keep fast serialization even if mounted under another app.
+router = APIRouter(prefix="/generate", tags=["generate"], default_response_class=ORJSONResponse)
 
 # Simple in-memory job store (in production, use Redis or database)
 job_store: dict = {}
 
+# Audit-log locations are fixed for the process lifetime; resolve once.
+_SUCCESS_LOG = os.path.join("logs", "success.csv")
+_FAILURE_LOG = os.path.join("logs", "failed.csv")
+
+
+def _stat(path: str):
+    """One stat(2) per path: existence check plus size/mtime in one syscall"""
+    try:
+        return os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+# Preview renders are independent per row, so they fan out across a small
+# shared process pool (PNG encode + compositing release no GIL worth
+# speaking of). Created lazily: most deployments never hit /preview.
+_preview_pool: Optional[ProcessPoolExecutor] = None
+_preview_pool_lock = Lock()
+
+
+def _get_preview_pool() -> ProcessPoolExecutor:
+    global _preview_pool
+    if _preview_pool is None:
+        with _preview_pool_lock:
+            if _preview_pool is None:
+                _preview_pool = ProcessPoolExecutor(
+                    max_workers=min(4, os.cpu_count() or 1),
+                    initializer=_preload_rendering_libs
+                )
+    return _preview_pool
+
+
+def _render_previews(template_path, placeholders, sample_rows, preview_dir):
+    """Render sample rows to PNGs in parallel; returns the written paths.
+
+    Each worker loads the template through its per-process cache, so the
+    decode cost is paid once per worker per upload, and N sample rows
+    cost roughly one row of wall time.
+    """
+    # All sample rows share the CSV header, so the case-insensitive
+    # column lookup is built once per request, not once per row (let
+    # alone once per placeholder).
+    normalized_columns = {
+        AdvancedPlaceholderService._normalize_key(col): col
+        for col in sample_rows[0].keys()
+    } if sample_rows else {}
+
+    futures = []
+    for idx, row_data in enumerate(sample_rows):
+        logger.info(f"Generating preview certificate {idx + 1} with data: {row_data}")
+        safe_name = _safe_filename_part(str(row_data.get('name', f'row_{idx}')))
+        output_path = os.path.join(preview_dir, f"preview_{idx + 1}_{safe_name}.png")
+        futures.append(_get_preview_pool().submit(
+            _render_preview_row, template_path, placeholders, row_data, output_path, normalized_columns
+        ))
+    return [f.result() for f in futures]
+
 
 class LegacyGenerateRequest(BaseModel):
-    """Legacy request schema for certificate generation"""
+    """Legacy request schema for certificate generation
+
+    Hot request shape: parsing stays inside pydantic-core's Rust pass
+    with no Python-level validators, and frozen models skip the mutable
+    __setattr__ machinery after construction.
+    """
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     template_path: str
     csv_path: Optional[str] = None
     names: Optional[List[str]] = None
@@ -35,6 +107,8 @@ class LegacyGenerateRequest(BaseModel):
 
 class MappingConfig(BaseModel):
     """Mapping configuration for CSV columns to certificate fields"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     name: str
     role: Optional[str] = None
     date: Optional[str] = None
@@ -42,32 +116,49 @@ class MappingConfig(BaseModel):
 
 class GenerateWithMappingRequest(BaseModel):
     """Request schema for certificate generation with mapping config"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     mapping: MappingConfig
 
 
+class BulkGenerateRequest(BaseModel):
+    """Request schema for submitting several generation jobs at once"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
+    mappings: List[MappingConfig]
+
+
 @router.post("/preview")
-async def generate_preview(request: LegacyGenerateRequest):
+def generate_preview(request: LegacyGenerateRequest):
     """
     Generate preview certificates (3 samples) for testing
-    
+
     This endpoint generates a few sample certificates to preview
     before generating the full batch
+
+    Handlers in this module are plain functions on purpose: they do
+    blocking OCR/PIL/disk work and no awaitable work, so FastAPI runs
+    them on its threadpool instead of stalling the event loop.
     """
     try:
-        # Validate template path exists
-        if not os.path.exists(request.template_path):
+        # The template keeps an explicit stat: placeholder detection
+        # swallows open errors into an empty result, which would turn a
+        # missing template into a confusing empty preview instead of a 404.
+        if _stat(request.template_path) is None:
             raise HTTPException(status_code=404, detail=f"Template not found: {request.template_path}")
-        
+
         # Detect ALL placeholders in template
         logger.info(f"Detecting all placeholders for template: {request.template_path}")
-        placeholders = AdvancedPlaceholderService.detect_all_placeholders(request.template_path)
+        placeholders = AdvancedPlaceholderService.detect_all_placeholders_cached(request.template_path)
         logger.info(f"Found placeholders: {list(placeholders.keys())}")
-        
-        # Get CSV data with all columns
+
+        # Get CSV data with all columns. EAFP: let the read itself raise
+        # rather than paying a pre-flight stat that can race with deletion.
         if request.csv_path:
-            if not os.path.exists(request.csv_path):
+            try:
+                csv_data = CSVService.get_all_data(request.csv_path)
+            except FileNotFoundError:
                 raise HTTPException(status_code=404, detail=f"CSV file not found: {request.csv_path}")
-            csv_data = CSVService.get_all_data(request.csv_path)
             sample_rows = csv_data[:3]  # Take first 3 rows
         else:
             # Use default sample data
@@ -77,52 +168,14 @@ async def generate_preview(request: LegacyGenerateRequest):
                 {"name": "Bob Johnson", "event": "Python Workshop", "date": "2024-01-15", "role": "Participant"}
             ]
         
-        # Convert template to image if it's a PDF
-        if request.template_path.lower().endswith('.pdf'):
-            template_images = PDFService.pdf_to_images(request.template_path)
-            template_image = template_images[0]
-        else:
-            from PIL import Image
-            template_image = Image.open(request.template_path)
-        
-        # Generate preview certificates
+        # Generate preview certificates; template decode happens in the
+        # pool workers against their per-process cache.
         preview_dir = os.path.join(settings.UPLOAD_DIR, "preview")
         os.makedirs(preview_dir, exist_ok=True)
-        
-        generated_files = []
-        for idx, row_data in enumerate(sample_rows):
-            # Start with template image
-            result_image = template_image.copy()
-            
-            # Render ALL placeholders on template
-            logger.info(f"Generating preview certificate {idx + 1} with data: {row_data}")
-            
-            for placeholder_name, placeholder_info in placeholders.items():
-                # Find matching CSV column (case-insensitive)
-                csv_column = None
-                for col in row_data.keys():
-                    if col.lower() == placeholder_name.lower():
-                        csv_column = col
-                        break
-                
-                if csv_column and row_data[csv_column]:
-                    # Get placeholder bbox
-                    bbox = placeholder_info.get('bbox', {})
-                    if bbox:
-                        # Render text on placeholder position
-                        result_image = PDFService.render_name_on_image(
-                            result_image,
-                            str(row_data[csv_column]),
-                            bbox=bbox,
-                            center=True
-                        )
-            
-            # Save preview image
-            safe_name = str(row_data.get('name', f'row_{idx}')).replace(' ', '_')
-            output_path = os.path.join(preview_dir, f"preview_{idx + 1}_{safe_name}.png")
-            result_image.save(output_path, "PNG")
-            generated_files.append(output_path)
-        
+
+        generated_files = _render_previews(request.template_path, placeholders, sample_rows, preview_dir)
+
+
         # Create a zip file with all preview certificates
         zip_path = os.path.join(preview_dir, "preview_certificates.zip")
         ZIPService.create_zip(generated_files, zip_path)
@@ -143,7 +196,7 @@ async def generate_preview(request: LegacyGenerateRequest):
 
 
 @router.post("/batch")
-async def generate_batch(
+def generate_batch(
     request: Optional[GenerateWithMappingRequest] = None,
     placeholder_text: str = "{{NAME}}"
 ):
@@ -152,7 +205,7 @@ async def generate_batch(
     """
     try:
         # Get latest uploads
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         if not latest["template"] or not latest["csv"]:
@@ -162,16 +215,19 @@ async def generate_batch(
         csv_path = latest["csv"]["file_path"]
         
         # Verify files exist
-        if not os.path.exists(template_path) or not os.path.exists(csv_path):
+        if _stat(template_path) is None or _stat(csv_path) is None:
             raise HTTPException(status_code=404, detail="Files not found on server")
             
-        # Estimate total items (read CSV quickly)
+        # Seed the job with a cheap newline-scan estimate (~GB/s) instead
+        # of a full pandas parse; the worker reconciles total_items with
+        # the real parsed row count before processing, so blank lines or
+        # quoted multiline fields can't skew when the job goes terminal.
         try:
-            df = CSVService.read_csv(csv_path)
-            total_items = len(df)
-        except:
+            total_items = CSVService.count_rows(csv_path)
+        except (OSError, ValueError):
             total_items = 0
-            
+
+
         # Create Job
         job_id = str(uuid.uuid4())
         JobService.create_job(job_id, total_items, {
@@ -180,9 +236,6 @@ async def generate_batch(
         })
         
         # Enqueue Task
-        from app.core.queue import q
-        from app.tasks.generation_tasks import generate_batch_task
-        
         mapping_dict = request.mapping.dict() if request and request.mapping else None
         
         # Pass arguments in the correct order matching the function signature
@@ -208,33 +261,122 @@ async def generate_batch(
         raise HTTPException(status_code=500, detail=f"Error starting batch generation: {str(e)}")
 
 
+# Serialized payloads for finished jobs: the frontend polls /status at
+# ~1Hz and a terminal job's answer never changes, so serve the cached
+# orjson bytes and skip the status.json read + encode entirely.
+_FINAL_STATUS_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_FINAL_STATUS_CACHE_MAX = 256
+_TERMINAL_STATUSES = ("completed", "completed_with_errors")
+
+
+@router.post("/batch-bulk")
+def generate_batch_bulk(
+    request: BulkGenerateRequest,
+    placeholder_text: str = "{{NAME}}"
+):
+    """
+    Start one generation job per mapping in a single submission
+
+    All jobs run against the latest uploaded template and CSV; the whole
+    batch is registered with the queue in one enqueue_many call instead
+    of one round-trip per job.
+    """
+    try:
+        metadata = get_upload_metadata()
+        latest = metadata.get_latest_uploads()
+
+        if not latest["template"] or not latest["csv"]:
+            raise HTTPException(status_code=404, detail="Missing template or CSV file")
+
+        template_path = latest["template"]["file_path"]
+        csv_path = latest["csv"]["file_path"]
+
+        if _stat(template_path) is None or _stat(csv_path) is None:
+            raise HTTPException(status_code=404, detail="Files not found on server")
+
+        try:
+            total_items = CSVService.count_rows(csv_path)
+        except (OSError, ValueError):
+            total_items = 0
+
+        job_ids = []
+        calls = []
+        for mapping in request.mappings:
+            job_id = str(uuid.uuid4())
+            JobService.create_job(job_id, total_items, {
+                "template": latest["template"]["filename"],
+                "csv": latest["csv"]["filename"]
+            })
+            job_ids.append(job_id)
+            calls.append((
+                generate_batch_task,
+                (job_id, template_path, csv_path, mapping.dict(), placeholder_text),
+                {}
+            ))
+
+        if isinstance(q, EnhancedQueue):
+            q.enqueue_many(calls)
+        else:
+            # RQ backend: rq.Queue also has an enqueue_many, but it takes
+            # EnqueueData objects, not our (func, args, kwargs) tuples —
+            # so dispatch on type and fall back to per-job enqueue.
+            for func, args, kwargs in calls:
+                q.enqueue(func, *args, **kwargs)
+
+        return {
+            "message": "Bulk batch generation started",
+            "job_ids": job_ids,
+            "status": "queued"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting bulk batch generation: {e}")
+        raise HTTPException(status_code=500, detail=f"Error starting bulk batch generation: {str(e)}")
+
+
 @router.get("/status/{job_id}")
-async def get_generation_status(job_id: str):
+def get_generation_status(job_id: str):
     """
     Get the status of a certificate generation job
     """
+    cached = _FINAL_STATUS_CACHE.get(job_id)
+    if cached is not None:
+        _FINAL_STATUS_CACHE.move_to_end(job_id)
+        return Response(content=cached, media_type="application/json")
+
     status = JobService.get_job_status(job_id)
     if not status:
         raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
-        
+
+    # Only cache once the payload is final: the download_url is stamped
+    # shortly after the terminal status, so wait for both.
+    if status.get("status") in _TERMINAL_STATUSES and status.get("download_url"):
+        _FINAL_STATUS_CACHE[job_id] = orjson.dumps(status)
+        while len(_FINAL_STATUS_CACHE) > _FINAL_STATUS_CACHE_MAX:
+            _FINAL_STATUS_CACHE.popitem(last=False)
+
     return status
 
 
 @router.get("/logs/success")
-async def get_success_log():
+def get_success_log():
     """
     Get the success log (success.csv) as a file download
     """
     try:
-        log_path = os.path.join("logs", "success.csv")
-        
-        if not os.path.exists(log_path):
+        st = _stat(_SUCCESS_LOG)
+        if st is None:
             raise HTTPException(status_code=404, detail="Success log not found")
-        
+
+        # Hand the stat result over so Starlette skips its own stat and can
+        # take the sendfile fast path directly.
         return FileResponse(
-            log_path,
+            _SUCCESS_LOG,
             media_type="text/csv",
-            filename="success.csv"
+            filename="success.csv",
+            stat_result=st
         )
     except HTTPException:
         raise
@@ -244,7 +386,7 @@ async def get_success_log():
 
 
 @router.get("/analyze-template/{template_path:path}")
-async def analyze_template(template_path: str):
+def analyze_template(template_path: str):
     """
     Analyze a template and return all detected placeholders
     
@@ -258,14 +400,14 @@ async def analyze_template(template_path: str):
         Dictionary with detected placeholders and their coordinates
     """
     try:
-        if not os.path.exists(template_path):
+        if _stat(template_path) is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Template not found: {template_path}"
             )
         
         # Detect all placeholders
-        placeholders = AdvancedPlaceholderService.detect_all_placeholders(template_path)
+        placeholders = AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
         
         # Validate template
         validation = AdvancedPlaceholderService.validate_template(template_path, required_placeholders=["NAME"])
@@ -284,20 +426,20 @@ async def analyze_template(template_path: str):
 
 
 @router.get("/logs/failures")
-async def get_failure_log():
+def get_failure_log():
     """
     Get the failure log (failed.csv) as a file download
     """
     try:
-        log_path = os.path.join("logs", "failed.csv")
-        
-        if not os.path.exists(log_path):
+        st = _stat(_FAILURE_LOG)
+        if st is None:
             raise HTTPException(status_code=404, detail="Failure log not found")
-        
+
         return FileResponse(
-            log_path,
+            _FAILURE_LOG,
             media_type="text/csv",
-            filename="failed.csv"
+            filename="failed.csv",
+            stat_result=st
         )
     except HTTPException:
         raise
@@ -307,7 +449,7 @@ async def get_failure_log():
 
 
 @router.get("/download/{filename}")
-async def download_certificates(filename: str):
+def download_certificates(filename: str):
     """Download generated certificate bundle."""
     try:
         if not filename.endswith(".zip"):
@@ -319,13 +461,25 @@ async def download_certificates(filename: str):
 
         file_path = os.path.join(settings.UPLOAD_DIR, "certificates", safe_name)
 
-        if not os.path.exists(file_path):
+        st = _stat(file_path)
+        if st is None:
+            # No prebuilt archive (e.g. the batch is still finishing or the
+            # zip was cleaned up): stream one straight from the job
+            # directory so the first bytes go out after the first file.
+            job_dir = os.path.join(settings.UPLOAD_DIR, "certificates", safe_name[:-4])
+            if _stat(job_dir) is not None:
+                return StreamingResponse(
+                    ZIPService.iter_zip_from_directory(job_dir),
+                    media_type="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="{safe_name}"'}
+                )
             raise HTTPException(status_code=404, detail="Download file not found")
 
         return FileResponse(
             file_path,
             media_type="application/zip",
-            filename=safe_name
+            filename=safe_name,
+            stat_result=st
         )
 
     except HTTPException:
@@ -1,8 +1,42 @@
-from fastapi import APIRouter
-from datetime import datetime
+import orjson
+from fastapi import APIRouter, Response
+from fastapi.responses import ORJSONResponse
 from app.models.schemas import HealthResponse, ServiceStatus
 
-router = APIRouter(prefix="/health", tags=["health"])
+# No prefix: the router is mounted under /health as its own sub-app in
+# main.py so probes skip the outer app's middleware stack entirely.
+# Timestamps come from the shared second-granularity clock in schemas.
+# ORJSONResponse is set on the router too so the fast serializer follows
+# these handlers wherever they're mounted.
+router = APIRouter(tags=["health"], default_response_class=ORJSONResponse)
+
+# Check payloads are constant strings; build them once, not per probe.
+_HEALTH_CHECKS = {
+    "database": "healthy",
+    "storage": "healthy",
+    "queue": "healthy"
+}
+
+# The Tesseract binary doesn't change at runtime, so its version is
+# probed once (a fork+exec of `tesseract --version`) instead of on every
+# readiness poll. Probed lazily on the first /ready rather than at import
+# so app startup isn't gated on the subprocess.
+_ready_checks: dict = {}
+
+
+def _get_ready_checks() -> dict:
+    if not _ready_checks:
+        try:
+            import pytesseract
+            tesseract = str(pytesseract.get_tesseract_version())
+        except Exception:
+            tesseract = None
+        _ready_checks.update({
+            "dependencies": "ready",
+            "external_apis": "ready",
+            "tesseract": tesseract or "unavailable"
+        })
+    return _ready_checks
 
 
 @router.get("/", response_model=HealthResponse)
@@ -10,16 +44,11 @@ async def health_check():
     """
     Health check endpoint
     """
-    return HealthResponse(
+    return HealthResponse.model_construct(
         status=ServiceStatus.HEALTHY,
-        timestamp=datetime.utcnow(),
         service="certimate-api",
         version="1.0.0",
-        checks={
-            "database": "healthy",
-            "storage": "healthy",
-            "queue": "healthy"
-        }
+        checks=_HEALTH_CHECKS
     )
 
 
@@ -28,25 +57,27 @@ async def readiness_check():
     """
     Readiness check endpoint
     """
-    # TODO: Add actual checks for required services/dependencies
-    return HealthResponse(
-        status=ServiceStatus.HEALTHY,
-        timestamp=datetime.utcnow(),
+    checks = _get_ready_checks()
+    status = ServiceStatus.HEALTHY if checks["tesseract"] != "unavailable" else ServiceStatus.DEGRADED
+    return HealthResponse.model_construct(
+        status=status,
         service="certimate-api",
-        checks={
-            "dependencies": "ready",
-            "external_apis": "ready"
-        }
+        checks=checks
     )
 
 
-@router.get("/live", response_model=HealthResponse)
+# Liveness only answers "is the process serving requests" — the payload
+# is a process-lifetime constant, so serialize it exactly once and hand
+# uvloop prebuilt bytes per probe.
+_LIVE_BYTES = orjson.dumps({
+    "status": ServiceStatus.HEALTHY.value,
+    "service": "certimate-api"
+})
+
+
+@router.get("/live", response_model=HealthResponse, response_model_exclude_none=True)
 async def liveness_check():
     """
     Liveness check endpoint
     """
-    return HealthResponse(
-        status=ServiceStatus.HEALTHY,
-        timestamp=datetime.utcnow(),
-        service="certimate-api"
-    )
+    return Response(content=_LIVE_BYTES, media_type="application/json")
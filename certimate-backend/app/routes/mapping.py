@@ -1,24 +1,97 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, List
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Optional, Dict, List
+import json
 import os
 import logging
 import base64
+from functools import lru_cache
 from io import BytesIO
 from app.services.csv_service import CSVService
 from app.services.pdf_service import PDFService
 from app.services.placeholder_advanced import AdvancedPlaceholderService
 from app.config import settings
-from app.utils.metadata import UploadMetadata
+from app.utils.metadata import get_upload_metadata
 from app.models.schemas import ErrorResponse
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/mapping", tags=["mapping"])
+# ORJSON on the router so the /preview response (a dict carrying a
+# multi-MB base64 string) goes through orjson's C encoder instead of
+# stdlib json; no response_model on these endpoints, and the `-> Any`
+# annotations keep FastAPI from inferring one and re-validating returns.
+router = APIRouter(prefix="/mapping", tags=["mapping"], default_response_class=ORJSONResponse)
 
+# Parsed-CSV cache keyed by (path, mtime_ns, size). The mapping UI hits
+# validate/preview/analyze repeatedly against the same unchanged upload
+# while the user picks columns, so each of those re-parses is pure waste;
+# a stat comparison is all it costs to reuse the DataFrame. lru_cache
+# bounds memory to eight frames; a changed upload gets a new key and its
+# stale parse ages out. Callers must treat the returned frame as
+# read-only — it is shared across requests.
+@lru_cache(maxsize=8)
+def _read_csv_cached(csv_path: str, mtime_ns: int, size: int):
+    return CSVService.read_csv(csv_path)
 
+
+def _stat_or_404(path: str, label: str) -> os.stat_result:
+    """Stat path, translating a missing file into the endpoint's 404.
+
+    One syscall replaces the old exists-then-open pair, and the returned
+    stat_result doubles as the cache key source for the CSV caches below.
+    """
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"{label} file not found: {path}"
+        )
+
+
+def _load_csv_cached(csv_path: str, st: os.stat_result = None):
+    """Return the parsed DataFrame for csv_path, re-reading only when the
+    file's (mtime_ns, size) signature changes."""
+    if st is None:
+        st = os.stat(csv_path)
+    return _read_csv_cached(csv_path, st.st_mtime_ns, st.st_size)
+
+
+# validate/analyze only look at the header and the first few rows, so they
+# go through a separate O(header + 3 rows) read instead of the full parse;
+# total_rows comes from a newline scan. Cached under the same stat-signature
+# scheme as _csv_cache.
+_CSV_HEAD_ROWS = 3
+_csv_head_cache: Dict[str, tuple] = {}
+
+# Column names that stand in for "role" when no role column is mapped,
+# matched case-insensitively. Built once at import; the old per-request
+# list of nine case variants is collapsed into three lowercase keys.
+EVENT_COLUMN_KEYS = frozenset({"event", "course", "program"})
+
+
+def _load_csv_head_cached(csv_path: str, st: os.stat_result = None):
+    """Return (columns, head_rows, total_rows) for csv_path, re-reading
+    only when the file's (mtime_ns, size) signature changes."""
+    if st is None:
+        st = os.stat(csv_path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _csv_head_cache.get(csv_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    columns, head_rows = CSVService.read_csv_head(csv_path, nrows=_CSV_HEAD_ROWS)
+    result = (columns, head_rows, CSVService.count_rows(csv_path))
+    _csv_head_cache[csv_path] = (key, result)
+    return result
+
+
+# frozen=True on the request models matches generate.py: the handlers
+# never mutate them, and frozen models skip pydantic's __setattr__
+# machinery after construction.
 class MappingConfig(BaseModel):
     """Mapping configuration for CSV columns to certificate fields"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     name: str
     role: Optional[str] = None
     date: Optional[str] = None
@@ -26,17 +99,21 @@ class MappingConfig(BaseModel):
 
 class ValidateMappingRequest(BaseModel):
     """Request schema for mapping validation"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     mapping: MappingConfig
 
 
 class PreviewRequest(BaseModel):
     """Request schema for certificate preview"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     mapping: MappingConfig
     row_index: int = 0  # Which row to use for preview (default: first row)
 
 
 @router.post("/validate")
-async def validate_mapping(request: ValidateMappingRequest):
+def validate_mapping(request: ValidateMappingRequest) -> Any:
     """
     Validate CSV mapping configuration
     
@@ -53,7 +130,7 @@ async def validate_mapping(request: ValidateMappingRequest):
     """
     try:
         # Get latest CSV file
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         if not latest["csv"]:
@@ -64,93 +141,78 @@ async def validate_mapping(request: ValidateMappingRequest):
         
         csv_path = latest["csv"]["file_path"]
         
-        # Validate file exists
-        if not os.path.exists(csv_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"CSV file not found: {csv_path}"
-            )
-        
-        logger.info(f"Validating mapping for CSV: {csv_path}")
-        logger.info(f"Mapping config: {request.mapping.dict()}")
-        
-        # Read CSV
-        df = CSVService.read_csv(csv_path)
-        
-        # Validate columns exist
+        # One stat checks existence and feeds the cache key
+        csv_stat = _stat_or_404(csv_path, "CSV")
+
+        logger.info("Validating mapping for CSV: %s", csv_path)
+        # Lazy %s form: the model repr is only built when DEBUG is on
+        logger.debug("Mapping config: %s", request.mapping)
+
+        # Validation only needs the header and row 0; skip the full parse
+        columns, head_rows, total_rows = _load_csv_head_cached(csv_path, csv_stat)
+
+        # One set build, then every membership test is O(1); the three
+        # copy-pasted per-field blocks collapse into a single pass.
+        # Unmapped optional fields keep the {valid: False, error: None}
+        # shape the frontend expects.
+        cols_set = set(columns)
         validation_results = {
-            "name": {"valid": False, "error": None},
-            "role": {"valid": False, "error": None},
-            "date": {"valid": False, "error": None},
+            field: {
+                "valid": bool(col) and col in cols_set,
+                "error": f"Column '{col}' not found in CSV" if col and col not in cols_set else None
+            }
+            for field, col in (
+                ("name", request.mapping.name),
+                ("role", request.mapping.role),
+                ("date", request.mapping.date),
+            )
         }
-        
-        # Validate name column (required)
-        if request.mapping.name not in df.columns:
+
+        # Name column is required
+        if not validation_results["name"]["valid"]:
             validation_results["name"] = {
                 "valid": False,
                 "error": f"Column '{request.mapping.name}' not found in CSV",
-                "details": f"Available columns: {df.columns.tolist()}"
+                "details": f"Available columns: {columns}"
             }
             raise HTTPException(
                 status_code=400,
                 detail={
                     "error": "Missing column",
                     "details": f"Column '{request.mapping.name}' not found in CSV",
-                    "available_columns": df.columns.tolist(),
+                    "available_columns": columns,
                     "validation": validation_results
                 }
             )
-        else:
-            validation_results["name"] = {"valid": True, "error": None}
-        
-        # Validate role column (optional)
-        if request.mapping.role:
-            if request.mapping.role not in df.columns:
-                validation_results["role"] = {
-                    "valid": False,
-                    "error": f"Column '{request.mapping.role}' not found in CSV"
-                }
-            else:
-                validation_results["role"] = {"valid": True, "error": None}
-        
-        # Validate date column (optional)
-        if request.mapping.date:
-            if request.mapping.date not in df.columns:
-                validation_results["date"] = {
-                    "valid": False,
-                    "error": f"Column '{request.mapping.date}' not found in CSV"
-                }
-            else:
-                validation_results["date"] = {"valid": True, "error": None}
-        
+
         # Get first row data for preview
         preview_data = {}
-        if len(df) > 0:
-            first_row = df.iloc[0]
+        if head_rows:
+            first_row = head_rows[0]
             preview_data = {
                 "name": str(first_row.get(request.mapping.name, "")),
                 "role": str(first_row.get(request.mapping.role, "")) if request.mapping.role else "",
                 "date": str(first_row.get(request.mapping.date, "")) if request.mapping.date else "",
             }
-        
-        logger.info(f"Mapping validation successful. Preview data: {preview_data}")
-        
+
+        logger.debug("Mapping validation successful. Preview data: %s", preview_data)
+
         return {
             "success": True,
             "message": "Mapping validated successfully",
             "validation": validation_results,
             "preview_data": preview_data,
             "csv_stats": {
-                "total_rows": len(df),
-                "total_columns": len(df.columns),
-                "columns": df.columns.tolist()
+                "total_rows": total_rows,
+                "total_columns": len(columns),
+                "columns": columns
             }
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error validating mapping: {e}")
+        logger.error("Error validating mapping: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
@@ -161,7 +223,12 @@ async def validate_mapping(request: ValidateMappingRequest):
 
 
 @router.post("/preview")
-async def generate_preview(request: PreviewRequest):
+def generate_preview(
+    request: PreviewRequest,
+    http_request: Request,
+    as_json: Optional[bool] = None,
+    image_format: str = "png"
+) -> Any:
     """
     Generate a preview certificate image based on mapping configuration
     
@@ -176,7 +243,7 @@ async def generate_preview(request: PreviewRequest):
     """
     try:
         # Get latest uploads
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         if not latest["template"]:
@@ -194,23 +261,14 @@ async def generate_preview(request: PreviewRequest):
         template_path = latest["template"]["file_path"]
         csv_path = latest["csv"]["file_path"]
         
-        # Validate files exist
-        if not os.path.exists(template_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Template file not found: {template_path}"
-            )
-        
-        if not os.path.exists(csv_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"CSV file not found: {csv_path}"
-            )
-        
-        logger.info(f"Generating preview certificate with mapping: {request.mapping.dict()}")
-        
+        # One stat each checks existence; the CSV's feeds the cache key
+        _stat_or_404(template_path, "Template")
+        csv_stat = _stat_or_404(csv_path, "CSV")
+
+        logger.debug("Generating preview certificate with mapping: %s", request.mapping)
+
         # Read CSV and get preview row data
-        df = CSVService.read_csv(csv_path)
+        df = _load_csv_cached(csv_path, csv_stat)
         
         # Validate row index
         if request.row_index >= len(df):
@@ -219,22 +277,27 @@ async def generate_preview(request: PreviewRequest):
                 detail=f"Row index {request.row_index} out of range. CSV has {len(df)} rows."
             )
         
-        # Get data from specified row
-        row_data = df.iloc[request.row_index]
-        
+        # Get data from specified row as a plain dict: one Series→dict
+        # conversion instead of a Series.get + str() per column, and
+        # every lookup from here on is a plain O(1) dict hit. Values stay
+        # native — the render loop str()'s only those a placeholder
+        # actually resolves.
+        row_dict = df.iloc[request.row_index].to_dict()
+        cols_set = set(df.columns)
+
         # Extract values based on mapping
-        name = str(row_data.get(request.mapping.name, ""))
-        role = str(row_data.get(request.mapping.role, "")) if request.mapping.role and request.mapping.role in df.columns else ""
-        date = str(row_data.get(request.mapping.date, "")) if request.mapping.date and request.mapping.date in df.columns else ""
+        name = str(row_dict.get(request.mapping.name, ""))
+        role = str(row_dict.get(request.mapping.role, "")) if request.mapping.role and request.mapping.role in cols_set else ""
+        date = str(row_dict.get(request.mapping.date, "")) if request.mapping.date and request.mapping.date in cols_set else ""
         
-        # Auto-detect event column if role is not mapped
+        # Auto-detect event column if role is not mapped: one pass over the
+        # columns with an O(1) set lookup per name instead of the old
+        # O(columns x variants) nested list scan
         if not role:
-            event_columns = ['event', 'Event', 'EVENT', 'course', 'Course', 'COURSE', 'program', 'Program', 'PROGRAM']
-            for col in df.columns:
-                if col in event_columns:
-                    role = str(row_data.get(col, ""))
-                    logger.info(f"Auto-detected event column: {col} with value: {role}")
-                    break
+            role_col = next((col for col in df.columns if col.lower() in EVENT_COLUMN_KEYS), None)
+            if role_col is not None:
+                role = str(row_dict.get(role_col, ""))
+                logger.info("Auto-detected event column: %s with value: %s", role_col, role)
         
         if not name:
             raise HTTPException(
@@ -248,94 +311,94 @@ async def generate_preview(request: PreviewRequest):
             for col in df.columns
         }
 
-        # Row dictionary for logging/response
-        row_dict = {
-            col: str(row_data.get(col, "")) if isinstance(row_data, dict) else str(row_data[col])
-            for col in df.columns
-        }
-        
-        logger.info(f"Preview data - Name: {name}, Role: {role}, Date: {date}")
-        
-        # Detect ALL placeholders in template
-        logger.info(f"Detecting all placeholders for template: {template_path}")
-        placeholders = AdvancedPlaceholderService.detect_all_placeholders(template_path)
-        logger.info(f"Found placeholders: {list(placeholders.keys())}")
-        
-        # Debug placeholder details
-        for ph_name, ph_info in placeholders.items():
-            logger.info(f"Placeholder {ph_name}: bbox={ph_info.get('bbox')}, text='{ph_info.get('text')}', confidence={ph_info.get('confidence')}")
-        
-        # Load template image
-        if template_path.lower().endswith('.pdf'):
-            template_images = PDFService.pdf_to_images(template_path)
-            template_image = template_images[0]
-        else:
-            from PIL import Image
-            template_image = Image.open(template_path)
-        
-        # Start with template image
-        result_image = template_image.copy()
-        
-        # Render ALL placeholders with mapped data
-        for placeholder_name, placeholder_info in placeholders.items():
-            csv_column = normalized_columns.get(placeholder_name)
-
-            if not csv_column and placeholder_info.get('raw_key'):
-                raw_normalized = AdvancedPlaceholderService._normalize_key(placeholder_info['raw_key'])
-                csv_column = normalized_columns.get(raw_normalized)
-
-            if not csv_column:
-                logger.info(
-                    "No matching CSV column for placeholder %s (available columns: %s)",
-                    placeholder_name,
-                    list(df.columns)
-                )
-                continue
-
-            value = str(row_dict.get(csv_column, "")).strip()
-            if not value:
-                logger.info(
-                    "Skipping placeholder %s: empty value in column '%s'",
-                    placeholder_name,
-                    csv_column
-                )
-                continue
-
-            # Get placeholder bbox
-            bbox = placeholder_info.get('bbox', {})
-            logger.info(f"Rendering {placeholder_name}: bbox={bbox}, data='{value}'")
-            if bbox:
-                # Render text on placeholder position
-                result_image = PDFService.render_name_on_image(
-                    result_image,
-                    value,
-                    bbox=bbox,
-                    center=True,
-                    placeholder_hint=placeholder_info.get('raw_key') or placeholder_name
+        logger.debug("Preview data - Name: %s, Role: %s, Date: %s", name, role, date)
+
+        # Detect ALL placeholders in template (cached by path+mtime: the
+        # OCR pass runs once per template, not once per preview click)
+        placeholders = AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
+
+        # Per-placeholder detail is DEBUG-only and guarded so the O(P)
+        # string formatting never runs at production log levels
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found placeholders: %s", list(placeholders.keys()))
+            for ph_name, ph_info in placeholders.items():
+                logger.debug(
+                    "Placeholder %s: bbox=%s, text='%s', confidence=%s",
+                    ph_name, ph_info.get('bbox'), ph_info.get('text'), ph_info.get('confidence')
                 )
-                logger.info(f"Successfully rendered {placeholder_name} -> {csv_column}: {value}")
-            else:
-                logger.warning(f"No bbox found for placeholder: {placeholder_name}")
         
-        # Convert image to base64
-        buffer = BytesIO()
-        result_image.save(buffer, format="PNG")
-        image_bytes = buffer.getvalue()
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+        # Load template image (cached by path+mtime; render_row_placeholders
+        # copies before drawing so the cached base stays pristine)
+        template_image = PDFService.template_image_cached(template_path)
         
+        # Resolve placeholder→column once; the render loop reuses it and
+        # the response below only str()'s the columns the template consumed
+        resolved_columns = PDFService.resolve_placeholder_columns(placeholders, normalized_columns)
+
+        # Render ALL placeholders with mapped data via the shared loop
+        result_image = PDFService.render_row_placeholders(
+            template_image, placeholders, row_dict, normalized_columns,
+            resolved_columns=resolved_columns
+        )
+
+        # Convert image to base64. b64encode straight off the buffer's
+        # memoryview (no getvalue() copy), decode as ascii (base64 output
+        # is pure ascii), and concatenate rather than re-formatting the
+        # multi-MB string through an f-string — the payload is copied once
+        # instead of four times.
+        # Preview bytes are displayed once and discarded, so spend as
+        # little CPU as possible in zlib — same level-1 tradeoff as the
+        # batch render path (~3-5x faster encode for marginally more
+        # bytes). ?image_format=webp opts into WebP (method=0): typically
+        # 5-10x faster to encode and 30-50% smaller than PNG, for clients
+        # that can take it.
+        buffer = BytesIO()
+        if image_format.lower() == "webp":
+            media_type = "image/webp"
+            result_image.save(buffer, format="WEBP", quality=85, method=0)
+        else:
+            media_type = "image/png"
+            result_image.save(buffer, format="PNG", compress_level=1, optimize=False)
+
+        # Only the columns a placeholder resolved to — for wide CSVs
+        # this skips N-k str() calls and keeps the payload small
+        preview_data = {
+            col: str(row_dict.get(col, ""))
+            for col in dict.fromkeys(resolved_columns.values())
+        }
+
         logger.info("Preview certificate generated successfully")
-        
+
+        # Clients get the raw bytes — no 33% base64 inflation, no JSON
+        # escape of a multi-MB string — by sending Accept: image/png or
+        # the explicit ?as_json=0; the row data travels in an ascii-safe
+        # header. The base64 data-URI JSON body stays the default for the
+        # existing frontend, and ?as_json=1 forces it regardless of
+        # Accept.
+        accept = http_request.headers.get("accept", "")
+        wants_binary = (
+            as_json is False
+            or (as_json is None and ("image/png" in accept or "image/webp" in accept))
+        )
+        if wants_binary:
+            return Response(
+                content=buffer.getvalue(),
+                media_type=media_type,
+                headers={"X-Preview-Data": json.dumps(preview_data, ensure_ascii=True)}
+            )
+
+        image_base64 = base64.b64encode(buffer.getbuffer()).decode('ascii')
         return {
             "success": True,
             "message": "Preview certificate generated successfully",
-            "preview_image": f"data:image/png;base64,{image_base64}",
-            "preview_data": row_dict
+            "preview_image": "data:" + media_type + ";base64," + image_base64,
+            "preview_data": preview_data
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating preview: {e}")
+        logger.error("Error generating preview: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
@@ -346,7 +409,7 @@ async def generate_preview(request: PreviewRequest):
 
 
 @router.get("/analyze-csv")
-async def analyze_csv():
+def analyze_csv() -> Any:
     """
     Analyze the latest uploaded CSV file and return column information
     
@@ -354,7 +417,7 @@ async def analyze_csv():
         JSON response with CSV columns, row count, and sample data
     """
     try:
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         if not latest["csv"]:
@@ -365,33 +428,23 @@ async def analyze_csv():
         
         csv_path = latest["csv"]["file_path"]
         
-        if not os.path.exists(csv_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"CSV file not found: {csv_path}"
-            )
-        
-        logger.info(f"Analyzing CSV: {csv_path}")
-        
-        # Read CSV
-        df = CSVService.read_csv(csv_path)
-        
-        # Get sample data (first 3 rows)
-        sample_data = []
-        for idx in range(min(3, len(df))):
-            row = df.iloc[idx]
-            sample_data.append(row.to_dict())
-        
-        logger.info(f"CSV analysis complete. Found {len(df.columns)} columns and {len(df)} rows")
-        
+        csv_stat = _stat_or_404(csv_path, "CSV")
+
+        logger.info("Analyzing CSV: %s", csv_path)
+
+        # Columns + first 3 rows only; total comes from the newline scan
+        columns, sample_data, total_rows = _load_csv_head_cached(csv_path, csv_stat)
+
+        logger.info("CSV analysis complete. Found %d columns and %d rows", len(columns), total_rows)
+
         return {
             "success": True,
             "message": "CSV analyzed successfully",
             "csv_stats": {
                 "filename": latest["csv"]["filename"],
-                "total_rows": len(df),
-                "total_columns": len(df.columns),
-                "columns": df.columns.tolist()
+                "total_rows": total_rows,
+                "total_columns": len(columns),
+                "columns": columns
             },
             "sample_data": sample_data
         }
@@ -399,7 +452,7 @@ async def analyze_csv():
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error analyzing CSV: {e}")
+        logger.error("Error analyzing CSV: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
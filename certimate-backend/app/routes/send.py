@@ -7,9 +7,14 @@ from pydantic import BaseModel, EmailStr
 from typing import List, Dict, Optional
 import logging
 import asyncio
+import uuid
+from app.core.queue import email_q
 from app.services.email_service import EmailService
+from app.services.job_service import JobService
+from app.tasks.email_tasks import send_email_batch_task
 from app.config import settings
 from app.models.schemas import EmailSendRequest as NewEmailSendRequest, EmailSendResponse, JobResponse, JobStatus
+from app.utils.metadata import get_upload_metadata
 import os
 
 logger = logging.getLogger(__name__)
@@ -109,21 +114,27 @@ async def send_certificates_email(request: LegacyEmailSendRequest):
             )
         
         # Use job-specific certificates directory where certificates are actually stored
-        from app.utils.metadata import UploadMetadata
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         if latest.get("template") and latest.get("csv"):
-            # Find the most recent job directory
-            import glob
-            cert_dirs = glob.glob(os.path.join("uploads/certificates", "*"))
-            cert_dirs = [d for d in cert_dirs if os.path.isdir(d) and not d.endswith('.zip')]
-            cert_dirs.sort(key=os.path.getmtime, reverse=True)
-            
-            if cert_dirs:
-                certificates_dir = cert_dirs[0]  # Use most recent job directory
-            else:
-                certificates_dir = request.certificates_dir
+            # Find the most recent job directory. scandir hands back
+            # dirent type/stat info with the listing, so this is one pass
+            # with no per-path isdir/getmtime syscalls and no full sort.
+            newest_dir = None
+            newest_mtime = -1.0
+            try:
+                with os.scandir("uploads/certificates") as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            mtime = entry.stat().st_mtime
+                            if mtime > newest_mtime:
+                                newest_dir = entry.path
+                                newest_mtime = mtime
+            except FileNotFoundError:
+                pass
+
+            certificates_dir = newest_dir or request.certificates_dir
         else:
             certificates_dir = request.certificates_dir
         
@@ -148,8 +159,6 @@ async def send_certificates_email(request: LegacyEmailSendRequest):
         ]
         
         # Create job for tracking
-        import uuid
-        from app.services.job_service import JobService
         job_id = str(uuid.uuid4())
         JobService.create_job(job_id, len(recipients_list), {
             "type": "email_batch",
@@ -157,9 +166,6 @@ async def send_certificates_email(request: LegacyEmailSendRequest):
         })
         
         # Enqueue email sending task
-        from app.core.queue import email_q
-        from app.tasks.email_tasks import send_email_batch_task
-        
         email_q.enqueue(
             send_email_batch_task,
             job_id,
@@ -190,7 +196,7 @@ async def send_certificates_email(request: LegacyEmailSendRequest):
                 "status": "queued" if i == 0 else "pending"
             })
         
-        response = EmailSendResponse(
+        response = EmailSendResponse.model_construct(
             job_id=job_id,
             recipients_count=len(recipients_list),
             batch_count=batch_count,
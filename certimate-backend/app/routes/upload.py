@@ -1,19 +1,34 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 import os
 import aiofiles
 import logging
 from app.config import settings
+from app.services.placeholder_advanced import AdvancedPlaceholderService
 from app.utils.fileutils import sanitize_filename
-from app.utils.metadata import UploadMetadata
+from app.utils.metadata import get_upload_metadata
 from app.models.schemas import FileUploadResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 
+def _precompute_placeholders(template_path: str):
+    """Run placeholder detection once right after upload.
+
+    Populates the in-process cache and writes the sidecar JSON, so the
+    first preview/generate against this template skips the OCR pass
+    entirely. Failures are non-fatal — detection will simply run lazily
+    on first use instead.
+    """
+    try:
+        AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
+    except Exception as exc:
+        logger.warning("Placeholder precompute failed for %s: %s", template_path, exc)
+
+
 @router.post("/template", response_model=FileUploadResponse)
-async def upload_template(file: UploadFile = File(...)):
+async def upload_template(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload certificate template (PDF or image file)
     Saves to uploads/templates directory
@@ -43,13 +58,18 @@ async def upload_template(file: UploadFile = File(...)):
             await f.write(content)
         
         # Record metadata
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         metadata.record_template_upload(file_path, safe_filename)
         
         # Get file size
         file_size = os.path.getsize(file_path)
-        
-        return FileUploadResponse(
+
+        # Kick off detection after the response is sent; the result lands
+        # in the detection cache + sidecar JSON before the user reaches
+        # the preview step
+        background_tasks.add_task(_precompute_placeholders, file_path)
+
+        return FileUploadResponse.model_construct(
             message="Template uploaded successfully",
             filename=safe_filename,
             file_path=file_path,
@@ -95,7 +115,7 @@ async def upload_csv(file: UploadFile = File(...)):
             await f.write(content)
         
         # Record metadata
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         metadata.record_csv_upload(file_path, safe_filename)
         
         return {
@@ -161,7 +181,7 @@ async def get_latest_uploads():
     Useful for automatically generating certificates without manually specifying paths.
     """
     try:
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         # Check if files exist
@@ -195,7 +215,7 @@ async def get_csv_content():
     Returns the actual CSV content for parsing on the frontend.
     """
     try:
-        metadata = UploadMetadata()
+        metadata = get_upload_metadata()
         latest = metadata.get_latest_uploads()
         
         if not latest["csv"]:
@@ -1,9 +1,20 @@
+import mmap
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# pandas can delegate full-file parses to pyarrow's multi-threaded C++
+# reader (engine="pyarrow", ~5-10x on large files). pyarrow is an optional
+# extra, and the arrow engine supports neither nrows nor chunksize, so
+# only read_csv uses it; the head/chunked paths stay on the C parser.
+try:
+    import pyarrow  # noqa: F401
+    _FULL_READ_KWARGS = {"engine": "pyarrow"}
+except ImportError:
+    _FULL_READ_KWARGS = {}
+
 
 class CSVService:
     """Service for processing CSV files"""
@@ -21,11 +32,23 @@ class CSVService:
             
             for encoding in encodings:
                 try:
-                    df = pd.read_csv(file_path, encoding=encoding)
+                    df = pd.read_csv(file_path, encoding=encoding, **_FULL_READ_KWARGS)
                     logger.info(f"Successfully read CSV file: {file_path} with encoding: {encoding}")
                     break
                 except UnicodeDecodeError:
                     continue
+                except Exception:
+                    if not _FULL_READ_KWARGS:
+                        raise
+                    # Arrow rejects some files (and surfaces encoding
+                    # errors differently than) the C parser accepts;
+                    # retry this encoding on the default engine.
+                    try:
+                        df = pd.read_csv(file_path, encoding=encoding)
+                        logger.info(f"Successfully read CSV file: {file_path} with encoding: {encoding}")
+                        break
+                    except UnicodeDecodeError:
+                        continue
             
             if df is None:
                 raise ValueError("Could not read CSV file with any encoding")
@@ -39,6 +62,84 @@ class CSVService:
             logger.error(f"Error reading CSV file: {e}")
             raise
     
+    @staticmethod
+    def iter_csv_chunks(file_path: str, chunksize: int = 100_000):
+        """
+        Yield the CSV as DataFrame chunks of at most chunksize rows.
+
+        Keeps peak memory at one chunk instead of the whole file, with
+        the same encoding fallbacks as read_csv. Column names of each
+        chunk are whitespace-stripped like read_csv's.
+        """
+        encodings = ['utf-8', 'latin-1', 'iso-8859-1']
+        reader = None
+
+        for encoding in encodings:
+            try:
+                reader = pd.read_csv(file_path, encoding=encoding, chunksize=chunksize)
+                # The encoding error only surfaces once bytes are read, so
+                # pull the first chunk before trusting this encoding.
+                first = next(reader, None)
+                logger.info(f"Reading CSV file in chunks: {file_path} with encoding: {encoding}")
+                break
+            except UnicodeDecodeError:
+                reader = None
+                continue
+
+        if reader is None:
+            raise ValueError("Could not read CSV file with any encoding")
+
+        if first is not None:
+            first.columns = first.columns.str.strip()
+            yield first
+        for chunk in reader:
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk
+
+    @staticmethod
+    def read_csv_head(file_path: str, nrows: int = 3) -> Tuple[List[str], List[Dict]]:
+        """
+        Read only the header and the first nrows data rows.
+
+        Returns (columns, head_rows) with the same encoding fallbacks and
+        column-name stripping as read_csv. Cost is O(header + nrows)
+        regardless of file size, so callers that only need columns and a
+        sample (analysis/validation endpoints) never pay for a full parse.
+        """
+        encodings = ['utf-8', 'latin-1', 'iso-8859-1']
+
+        for encoding in encodings:
+            try:
+                df = pd.read_csv(file_path, encoding=encoding, nrows=nrows)
+                df.columns = df.columns.str.strip()
+                return df.columns.tolist(), df.to_dict('records')
+            except UnicodeDecodeError:
+                continue
+
+        raise ValueError("Could not read CSV file with any encoding")
+
+    @staticmethod
+    def count_rows(file_path: str) -> int:
+        """
+        Count data rows (header excluded) with a C-level newline scan over
+        the mmap'd file — ~10x faster than parsing for row counts alone.
+        Off-by-one safe for files without a trailing newline; embedded
+        newlines in quoted fields make this an estimate, which is all the
+        stats/progress callers need.
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    lines = mm.count(b'\n')
+                    if len(mm) and mm[-1:] != b'\n':
+                        lines += 1
+                finally:
+                    mm.close()
+            return max(lines - 1, 0)
+        except (OSError, ValueError):
+            return 0
+
     @staticmethod
     def get_names_from_csv(file_path: str, name_column: str = None) -> List[str]:
         """
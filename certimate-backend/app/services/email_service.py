@@ -357,14 +357,15 @@ class EmailService:
         """Find a certificate file for a given name"""
         try:
             search_name = name.replace(' ', '_').lower()
-            if not os.path.exists(certificates_dir):
-                return None
-            
-            files = os.listdir(certificates_dir)
-            for filename in files:
-                if filename.endswith('.zip'): continue
-                if search_name in filename.lower():
-                    return filename
+            # scandir streams dirents, so the scan stops at the first
+            # match instead of materializing the whole listing; a missing
+            # directory just raises into the except below.
+            with os.scandir(certificates_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.zip'):
+                        continue
+                    if search_name in entry.name.lower():
+                        return entry.name
             return None
         except Exception:
             return None
\ No newline at end of file
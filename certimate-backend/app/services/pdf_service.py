@@ -2,13 +2,21 @@ from pdf2image import convert_from_path
 import pytesseract
 from PIL import Image, ImageDraw, ImageFont
 from typing import List, Dict, Tuple, Optional
-from collections import Counter
+from collections import Counter, OrderedDict
+from threading import Lock
 import logging
 import os
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Rasterized-template cache: Poppler rasterization at 300 dpi costs hundreds
+# of ms per page, so keep the first page of recently used templates keyed by
+# (path, mtime, dpi). Small LRU — templates are a handful of large images.
+_TEMPLATE_IMAGE_CACHE: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+_TEMPLATE_IMAGE_CACHE_MAX = 8
+_TEMPLATE_IMAGE_CACHE_LOCK = Lock()
+
 # Configure pytesseract to use the correct tesseract path
 pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
 
@@ -24,6 +32,56 @@ PREFERRED_FONTS = [
     "C:/Windows/Fonts/TIMESBD.TTF",
 ]
 
+# Fallbacks by general availability
+GENERIC_FONTS = [
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+# Loaded ImageFont instances keyed by (path, size). ImageFont.truetype
+# re-parses the TTF on every call; a 1000-name batch would otherwise pay
+# a FreeType parse (plus the candidate-path probing) per certificate.
+_FONT_CACHE: Dict[Tuple[str, int], ImageFont.ImageFont] = {}
+_FONT_PATH_CACHE: Dict[str, Optional[str]] = {}
+
+
+def _font_path() -> Optional[str]:
+    """First loadable font path, resolved once per process.
+
+    Candidates are probed by actually loading them with ImageFont.truetype
+    rather than os.path.exists: a present-but-unparsable file would
+    otherwise get memoized and pin every render to load_default().
+    """
+    if "path" not in _FONT_PATH_CACHE:
+        resolved = None
+        for candidate in PREFERRED_FONTS + GENERIC_FONTS:
+            try:
+                ImageFont.truetype(candidate, 12)
+            except Exception:
+                continue
+            resolved = candidate
+            break
+        _FONT_PATH_CACHE["path"] = resolved
+    return _FONT_PATH_CACHE["path"]
+
+
+def _load_font(size: int) -> ImageFont.ImageFont:
+    """Cached font lookup; disk is touched at most once per (path, size)"""
+    path = _font_path()
+    key = (path, size)
+    font = _FONT_CACHE.get(key)
+    if font is None:
+        if path is not None:
+            try:
+                font = ImageFont.truetype(path, size)
+            except Exception:
+                font = ImageFont.load_default()
+        else:
+            font = ImageFont.load_default()
+        _FONT_CACHE[key] = font
+    return font
+
 
 class PDFService:
     """Service for processing PDF files and rendering names on images"""
@@ -71,6 +129,145 @@ class PDFService:
                     raise
             raise
     
+    @staticmethod
+    def pdf_first_page_cached(pdf_path: str, dpi: int = 300) -> Image.Image:
+        """
+        Rasterized first page of a PDF, cached by (path, mtime, dpi).
+
+        The returned image is shared across callers — .copy() it before
+        drawing. A re-upload changes mtime and misses the cache naturally.
+        """
+        try:
+            mtime_ns = os.stat(pdf_path).st_mtime_ns
+        except OSError:
+            return PDFService.pdf_to_images(pdf_path, dpi=dpi)[0]
+
+        key = (pdf_path, mtime_ns, dpi)
+        with _TEMPLATE_IMAGE_CACHE_LOCK:
+            cached = _TEMPLATE_IMAGE_CACHE.get(key)
+            if cached is not None:
+                _TEMPLATE_IMAGE_CACHE.move_to_end(key)
+                return cached
+
+        image = PDFService.pdf_to_images(pdf_path, dpi=dpi)[0]
+
+        with _TEMPLATE_IMAGE_CACHE_LOCK:
+            _TEMPLATE_IMAGE_CACHE[key] = image
+            while len(_TEMPLATE_IMAGE_CACHE) > _TEMPLATE_IMAGE_CACHE_MAX:
+                _TEMPLATE_IMAGE_CACHE.popitem(last=False)
+        return image
+
+    @staticmethod
+    def template_image_cached(template_path: str, dpi: int = 300) -> Image.Image:
+        """
+        Decoded template image, cached by (path, mtime): rasterized first
+        page for PDFs, the decoded bitmap for PNG/JPEG templates.
+
+        Same sharing contract as pdf_first_page_cached — callers must
+        .copy() before drawing.
+        """
+        if template_path.lower().endswith('.pdf'):
+            return PDFService.pdf_first_page_cached(template_path, dpi=dpi)
+
+        try:
+            mtime_ns = os.stat(template_path).st_mtime_ns
+        except OSError:
+            image = Image.open(template_path)
+            image.load()
+            return image
+
+        key = (template_path, mtime_ns, None)
+        with _TEMPLATE_IMAGE_CACHE_LOCK:
+            cached = _TEMPLATE_IMAGE_CACHE.get(key)
+            if cached is not None:
+                _TEMPLATE_IMAGE_CACHE.move_to_end(key)
+                return cached
+
+        image = Image.open(template_path)
+        image.load()
+
+        with _TEMPLATE_IMAGE_CACHE_LOCK:
+            _TEMPLATE_IMAGE_CACHE[key] = image
+            while len(_TEMPLATE_IMAGE_CACHE) > _TEMPLATE_IMAGE_CACHE_MAX:
+                _TEMPLATE_IMAGE_CACHE.popitem(last=False)
+        return image
+
+    @staticmethod
+    def resolve_placeholder_columns(
+        placeholders: Dict[str, Dict],
+        normalized_columns: Dict[str, str]
+    ) -> Dict[str, str]:
+        """
+        Map each placeholder name to the CSV column it resolves to.
+
+        Tries the placeholder name against normalized_columns first, then
+        the placeholder's raw_key. Placeholders with no matching column are
+        omitted. The mapping depends only on the template and the CSV
+        header, so callers rendering many rows compute it once and pass it
+        to render_row_placeholders.
+        """
+        from app.services.placeholder_advanced import AdvancedPlaceholderService
+
+        resolved = {}
+        for placeholder_name, placeholder_info in placeholders.items():
+            csv_column = normalized_columns.get(placeholder_name)
+
+            if not csv_column and placeholder_info.get('raw_key'):
+                raw_normalized = AdvancedPlaceholderService._normalize_key(placeholder_info['raw_key'])
+                csv_column = normalized_columns.get(raw_normalized)
+
+            if csv_column:
+                resolved[placeholder_name] = csv_column
+        return resolved
+
+    @staticmethod
+    def render_row_placeholders(
+        image: Image.Image,
+        placeholders: Dict[str, Dict],
+        row_dict: Dict[str, str],
+        normalized_columns: Dict[str, str],
+        copy: bool = True,
+        resolved_columns: Optional[Dict[str, str]] = None
+    ) -> Image.Image:
+        """
+        Render every matched placeholder for one CSV row onto the image.
+
+        Shared by the batch worker and both preview endpoints so the
+        placeholder→column resolution and render loop exist exactly once.
+        normalized_columns maps _normalize_key(column) -> column. With
+        copy=True the input image is left untouched; with copy=False the
+        caller passes an image it owns and drawing happens in place.
+        resolved_columns, when given, is a precomputed
+        resolve_placeholder_columns result shared across rows.
+        """
+        if resolved_columns is None:
+            resolved_columns = PDFService.resolve_placeholder_columns(placeholders, normalized_columns)
+
+        result_image = image.copy() if copy else image
+        # Normalize the mode and open the draw context once for the whole
+        # row instead of per placeholder
+        if result_image.mode != 'RGB':
+            result_image = result_image.convert('RGB')
+        draw = ImageDraw.Draw(result_image)
+        for placeholder_name, csv_column in resolved_columns.items():
+            placeholder_info = placeholders[placeholder_name]
+            value = str(row_dict.get(csv_column, "")).strip()
+            if not value:
+                continue
+
+            bbox = placeholder_info.get('bbox', {})
+            if bbox:
+                result_image = PDFService.render_name_on_image(
+                    result_image,
+                    value,
+                    bbox=bbox,
+                    center=True,
+                    placeholder_hint=placeholder_info.get('raw_key') or placeholder_name,
+                    copy=False,
+                    draw=draw
+                )
+        return result_image
+
     @staticmethod
     def detect_background_color(image: Image.Image, bbox: Dict) -> Tuple[int, int, int]:
         """
@@ -123,42 +320,30 @@ class PDFService:
         font_size: Optional[int] = None,
         font_color: Tuple[int, int, int] = (0, 0, 0),
         center: bool = False,
-        placeholder_hint: Optional[str] = None
+        placeholder_hint: Optional[str] = None,
+        copy: bool = True,
+        draw: Optional[ImageDraw.ImageDraw] = None
     ) -> Image.Image:
         """
         Render name on an image with CLEAN placeholder replacement
+
+        With copy=False the caller guarantees the image is private (already
+        a per-row copy) and drawing happens in place — a full-page template
+        copy per placeholder is pure memory-bandwidth waste. A caller
+        drawing several placeholders can also pass its own draw context,
+        in which case the image must already be RGB.
         """
         try:
             # Create a copy of the image to avoid modifying the original
-            result_image = image.copy()
-            
-            # Ensure image is in RGB mode
-            if result_image.mode != 'RGB':
-                result_image = result_image.convert('RGB')
-            
-            # Create a drawing context
-            draw = ImageDraw.Draw(result_image)
-
-            def load_font(size: int) -> ImageFont.FreeTypeFont:
-                for font_path in PREFERRED_FONTS:
-                    if os.path.exists(font_path):
-                        try:
-                            return ImageFont.truetype(font_path, size)
-                        except Exception:
-                            continue
-                # Fallbacks by general availability
-                generic_fonts = [
-                    "/System/Library/Fonts/Supplemental/Arial.ttf",
-                    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                    "C:/Windows/Fonts/arial.ttf",
-                ]
-                for font_path in generic_fonts:
-                    if os.path.exists(font_path):
-                        try:
-                            return ImageFont.truetype(font_path, size)
-                        except Exception:
-                            continue
-                return ImageFont.load_default()
+            result_image = image.copy() if copy else image
+
+            if draw is None:
+                # Ensure image is in RGB mode
+                if result_image.mode != 'RGB':
+                    result_image = result_image.convert('RGB')
+
+                # Create a drawing context
+                draw = ImageDraw.Draw(result_image)
 
             def derive_font_size(base_size: int, text: str, bounding_box: Dict) -> int:
                 if not bounding_box:
@@ -174,7 +359,7 @@ class PDFService:
                 trial_draw = ImageDraw.Draw(trial_image)
 
                 while size >= 8:
-                    font_candidate = load_font(size)
+                    font_candidate = _load_font(size)
                     text_bbox = trial_draw.textbbox((0, 0), text, font=font_candidate)
                     text_width = text_bbox[2] - text_bbox[0]
                     text_height = text_bbox[3] - text_bbox[1]
@@ -230,7 +415,7 @@ class PDFService:
                     name,
                     bbox
                 )
-                font = load_font(derived_size)
+                font = _load_font(derived_size)
 
                 # STEP 3: Calculate position for new text (centered in bbox)
                 bbox_text = draw.textbbox((0, 0), name, font=font)
@@ -243,7 +428,7 @@ class PDFService:
 
             else:
                 derived_size = font_size or infer_base_font_size(placeholder_hint)
-                font = load_font(derived_size)
+                font = _load_font(derived_size)
                 # No bbox provided - center on the entire image
                 bbox_text = draw.textbbox((0, 0), name, font=font)
                 text_width = bbox_text[2] - bbox_text[0]
@@ -7,9 +7,12 @@ Detects placeholders like:
 Returns structured coordinate data for clean text replacement.
 """
 
-import json
 import logging
+import os
 import re
+
+import orjson
+from functools import lru_cache
 from typing import Dict, List, Optional
 
 from PIL import Image, ImageEnhance, ImageFilter
@@ -22,6 +25,22 @@ logger = logging.getLogger(__name__)
 # Configure tesseract
 pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
 
+
+@lru_cache(maxsize=4096)
+def _normalize_key_cached(raw_key: str) -> str:
+    """Memoized key normalization.
+
+    Column and placeholder names are a small set reused across requests
+    and across every row of a batch, so after first sight each
+    normalization is a dict hit instead of two regex passes.
+    """
+    cleaned = (raw_key or "").strip()
+    cleaned = re.sub(r"\s+", "_", cleaned)
+    cleaned = re.sub(r"[^A-Za-z0-9_]", "", cleaned)
+    if not cleaned:
+        return ""
+    return cleaned.upper()
+
 # STRICT placeholder rule (double braces required)
 PLACEHOLDER_REGEX = re.compile(r"\{\{\s*([A-Za-z0-9_\- ]+?)\s*\}\}")
 MIN_CONFIDENCE = 60
@@ -170,12 +189,9 @@ class AdvancedPlaceholderService:
 
     @staticmethod
     def _normalize_key(raw_key: str) -> str:
-        cleaned = (raw_key or "").strip()
-        cleaned = re.sub(r"\s+", "_", cleaned)
-        cleaned = re.sub(r"[^A-Za-z0-9_]", "", cleaned)
-        if not cleaned:
-            return ""
-        return cleaned.upper()
+        # Delegates to the module-level lru_cache'd function; staticmethods
+        # can't carry the cache themselves without per-class gymnastics.
+        return _normalize_key_cached(raw_key)
 
     # ---------- Public API ----------
 
@@ -255,13 +271,28 @@ class AdvancedPlaceholderService:
 
         return placeholders
 
+    @staticmethod
+    def detect_all_placeholders_cached(template_path: str) -> Dict[str, Dict]:
+        """
+        Memoized detect_all_placeholders keyed on (path, mtime).
+
+        OCR detection runs several tesseract passes and dominates request
+        latency; repeat calls against an unchanged template are served from
+        cache, and a re-upload (new mtime) invalidates automatically.
+        """
+        try:
+            mtime_ns = os.stat(template_path).st_mtime_ns
+        except OSError:
+            return AdvancedPlaceholderService.detect_all_placeholders(template_path)
+        return _detect_all_placeholders_cached(template_path, mtime_ns)
+
     @staticmethod
     def find_placeholder_bbox(template_path: str, placeholder_text: str = "{name}") -> List[Dict]:
         """
         Legacy-compatible single placeholder lookup.
         """
         target_key = placeholder_text.replace("{", "").replace("}", "").upper()
-        placeholders = AdvancedPlaceholderService.detect_all_placeholders(template_path)
+        placeholders = AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
 
         if target_key in placeholders:
             record = placeholders[target_key]
@@ -292,23 +323,25 @@ class AdvancedPlaceholderService:
     @staticmethod
     def save_placeholder_data(placeholders: Dict, file_path: str) -> None:
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(placeholders, f, indent=2)
+            # orjson emits compact utf-8 bytes directly — no str
+            # intermediate, several times faster than stdlib json
+            with open(file_path, "wb") as f:
+                f.write(orjson.dumps(placeholders))
         except Exception as exc:
             logger.error("Error saving placeholder data to %s: %s", file_path, exc)
 
     @staticmethod
     def load_placeholder_data(file_path: str) -> Dict:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with open(file_path, "rb") as f:
+                return orjson.loads(f.read())
         except Exception:
             return {}
 
     @staticmethod
     def validate_template(template_path: str, required_placeholders: List[str] = None) -> Dict:
         required = required_placeholders or ["NAME"]
-        detected = AdvancedPlaceholderService.detect_all_placeholders(template_path)
+        detected = AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
 
         detected_keys = list(detected.keys())
         missing = [name.upper() for name in required if name.upper() not in detected]
@@ -323,10 +356,41 @@ class AdvancedPlaceholderService:
 
     @staticmethod
     def get_placeholder_suggestions(template_path: str) -> List[str]:
-        detected = AdvancedPlaceholderService.detect_all_placeholders(template_path)
+        detected = AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
         suggestions = ["NAME"]
         common = ["EVENT", "DATE", "ROLE", "COURSE", "ORG"]
         for item in common:
             if item not in detected:
                 suggestions.append(item)
         return suggestions
+
+
+def _placeholder_sidecar_path(template_path: str) -> str:
+    """Path of the persisted detection result next to the template"""
+    return os.path.splitext(template_path)[0] + "_placeholders.json"
+
+
+@lru_cache(maxsize=64)
+def _detect_all_placeholders_cached(template_path: str, mtime_ns: int) -> Dict[str, Dict]:
+    """lru_cache-backed detection; mtime_ns keys invalidation on re-upload.
+
+    Detection is deterministic per template, so results are also persisted
+    to a sidecar JSON beside the template: a fresh process (or a sibling
+    worker) reads that file instead of re-running OCR, and the upload
+    route precomputes it in the background so the first preview after an
+    upload is already warm. A sidecar older than the template is stale
+    (re-uploaded file) and gets rewritten.
+    """
+    sidecar = _placeholder_sidecar_path(template_path)
+    try:
+        if os.stat(sidecar).st_mtime_ns >= mtime_ns:
+            data = AdvancedPlaceholderService.load_placeholder_data(sidecar)
+            if data:
+                return data
+    except OSError:
+        pass
+
+    placeholders = AdvancedPlaceholderService.detect_all_placeholders(template_path)
+    if placeholders:
+        AdvancedPlaceholderService.save_placeholder_data(placeholders, sidecar)
+    return placeholders
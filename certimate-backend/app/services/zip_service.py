@@ -1,14 +1,51 @@
 import zipfile
 import os
-from typing import List
+from typing import Iterator, List
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Formats that already carry their own compression; deflating them again
+# inside the archive burns CPU for ~0% size reduction.
+_PRECOMPRESSED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.pdf', '.zip')
+
+
+class _ChunkCollector:
+    """Write-only sink for zipfile that hands finished bytes to a generator.
+
+    zipfile writes local headers, file data and data descriptors through
+    this object; drain() returns everything written since the last drain
+    so the archive can be yielded to the client as it is built.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
 class ZIPService:
     """Service for processing ZIP files"""
-    
+
     @staticmethod
     def extract_zip(zip_path: str, extract_to: str) -> List[str]:
         """
@@ -29,18 +66,57 @@ class ZIPService:
             raise
     
     @staticmethod
-    def create_zip(files: List[str], output_path: str) -> str:
+    def create_zip(files: List[str], output_path: str, compression: int = None) -> str:
         """
         Create ZIP file from list of files
+
+        Compression is chosen per entry: already-compressed formats
+        (PNG/JPEG/PDF/ZIP) are STORED — deflate buys <1% on them at
+        ~10 MB/s — while text-like entries (.csv, .txt, logs) still get
+        ZIP_DEFLATED. Pass an explicit compression to force one mode.
         """
         try:
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zipf:
                 for file_path in files:
                     if os.path.isfile(file_path):
-                        zipf.write(file_path, os.path.basename(file_path))
+                        if compression is not None:
+                            compress_type = compression
+                        elif file_path.lower().endswith(_PRECOMPRESSED_EXTENSIONS):
+                            compress_type = zipfile.ZIP_STORED
+                        else:
+                            compress_type = zipfile.ZIP_DEFLATED
+                        zipf.write(
+                            file_path,
+                            os.path.basename(file_path),
+                            compress_type=compress_type
+                        )
             
             logger.info(f"Created ZIP file: {output_path}")
             return output_path
         except Exception as e:
             logger.error(f"Error creating ZIP file: {e}")
             raise
+
+    @staticmethod
+    def iter_zip_from_directory(directory: str) -> Iterator[bytes]:
+        """
+        Stream a STORED zip of a directory's files, yielding archive bytes
+        as each entry is written.
+
+        Nothing is buffered to disk or held for the whole archive, so the
+        first bytes reach the client after the first file instead of after
+        the full archive is assembled. Meant to be handed straight to a
+        StreamingResponse (Starlette drives sync generators from its
+        threadpool).
+        """
+        collector = _ChunkCollector()
+        with zipfile.ZipFile(collector, 'w', zipfile.ZIP_STORED, allowZip64=True) as zipf:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        zipf.write(entry.path, entry.name)
+                        yield collector.drain()
+        # Central directory written on close
+        tail = collector.drain()
+        if tail:
+            yield tail
@@ -1,5 +1,4 @@
 import os
-import asyncio
 import logging
 from typing import List, Dict
 from app.services.email_service import EmailService
@@ -10,7 +9,7 @@ os.environ['OBJC_DISABLE_INITIALIZE_FORK_SAFETY'] = 'YES'
 
 logger = logging.getLogger(__name__)
 
-def send_email_batch_task(
+async def send_email_batch_task(
     job_id: str,
     access_token: str,
     recipients: List[Dict[str, str]],
@@ -20,7 +19,8 @@ def send_email_batch_task(
     event_name: str = None
 ):
     """
-    Background task for sending certificate emails
+    Background task for sending certificate emails.
+    Runs as a coroutine on the async email queue's event loop.
     """
     try:
         logger.info(f"Starting email batch task for job {job_id}")
@@ -49,14 +49,14 @@ def send_email_batch_task(
         })
         
         # Send emails using the EmailService
-        result = asyncio.run(EmailService.send_certificates_batch(
+        result = await EmailService.send_certificates_batch(
             access_token=access_token,
             recipients=recipients,
             certificates_dir=certificates_dir,
             subject=subject,
             body_template=body_template,
             event_name=event_name
-        ))
+        )
         
         # Update job progress for each result
         for detail in result.get('details', []):
@@ -5,31 +5,163 @@ os.environ['OBJC_DISABLE_INITIALIZE_FORK_SAFETY'] = 'YES'
 
 import logging
 import uuid
-from typing import Dict, Optional
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
 from app.services.job_service import JobService
 from app.services.pdf_service import PDFService
 from app.services.csv_service import CSVService
 from app.services.placeholder_advanced import AdvancedPlaceholderService
-from app.services.zip_service import ZIPService
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-def generate_batch_task(job_id: str, template_path: str, csv_path: str, mapping: Dict = None, placeholder_text: str = "{{NAME}}"):
+# Filename sanitization as one C-level translate pass: spaces, path
+# separators, shell-hostile characters and control chars all map to '_'.
+_SAFE_TBL = str.maketrans({c: '_' for c in ' /\\:*?"<>|\t\n\r'})
+
+
+def _safe_filename_part(name: str) -> str:
+    return name.translate(_SAFE_TBL)
+
+# Per-worker render state, populated by _init_render_worker. Workers map the
+# template pixels from shared memory instead of each decoding/rasterizing
+# their own copy.
+_worker_shm = None
+_worker_template_image = None
+_worker_placeholders = None
+_worker_normalized_columns = None
+_worker_resolved_columns = None
+
+
+def _load_template_image(template_path: str):
+    """Load (or rasterize) the template into a PIL image, cached per process"""
+    return PDFService.template_image_cached(template_path)
+
+
+def _init_render_worker(template_spec: Tuple, placeholders: Dict, normalized_columns: Dict):
+    """Initializer for render workers: attach the shared template buffer.
+
+    The parent decodes/rasterizes the template exactly once and publishes
+    the raw pixels through shared memory; each worker wraps that buffer in
+    a read-only Image and takes a private copy per row.
+    """
+    global _worker_shm, _worker_template_image, _worker_placeholders, \
+        _worker_normalized_columns, _worker_resolved_columns
+    from PIL import Image
+    shm_name, mode, size = template_spec
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_template_image = Image.frombuffer(mode, size, _worker_shm.buf, "raw", mode, 0, 1)
+    _worker_placeholders = placeholders
+    _worker_normalized_columns = normalized_columns
+    # Placeholder→column resolution depends only on template + header, so
+    # resolve once per worker instead of once per row
+    _worker_resolved_columns = PDFService.resolve_placeholder_columns(placeholders, normalized_columns)
+
+
+def _render_row(args):
+    """Render one certificate in a worker process.
+
+    Returns (idx, name_value, output_path, error); error is None on success
+    so the parent can do all JobService/audit writes single-writer.
+    """
+    idx, row_dict, name_column, output_dir = args
+    name_value = ""
+    try:
+        name_value = row_dict.get(name_column, "").strip()
+        if not name_value:
+            return (idx, "", None, "Empty name")
+
+        # One private copy per row; the shared render loop draws each
+        # placeholder in place on it.
+        result_image = PDFService.render_row_placeholders(
+            _worker_template_image.copy(),
+            _worker_placeholders,
+            row_dict,
+            _worker_normalized_columns,
+            copy=False,
+            resolved_columns=_worker_resolved_columns
+        )
+
+        filename = f"certificate_{idx + 1}_{_safe_filename_part(name_value)}.png"
+        output_path = os.path.join(output_dir, filename)
+        # Certificates are transient outputs that get zipped immediately, so
+        # spend as little CPU as possible in zlib (level 1 deflates ~3-5x
+        # faster than the default level 6 for a marginally larger file).
+        result_image.save(output_path, "PNG", compress_level=1, optimize=False)
+        return (idx, name_value, output_path, None)
+
+    except Exception as e:
+        return (idx, name_value, None, str(e))
+
+
+def _render_preview_row(template_path: str, placeholders: Dict, row_data: Dict, output_path: str, normalized_columns: Dict) -> str:
+    """Render one preview row in a pool worker.
+
+    Loads the template through the per-process cache (so each worker
+    decodes it at most once per upload) and leaves the cached base
+    untouched by rendering onto a copy. normalized_columns is computed
+    once per request by the caller since all rows share the CSV header.
+    """
+    template_image = _load_template_image(template_path)
+    result_image = PDFService.render_row_placeholders(
+        template_image, placeholders, row_data, normalized_columns
+    )
+    result_image.save(output_path, "PNG", compress_level=1, optimize=False)
+    return output_path
+
+
+def generate_batch_task(job_id: str, template_path: str, csv_path: str, mapping: Dict = None, placeholder_text: str = "{{NAME}}", records: Optional[List[Dict]] = None):
     """
     Background task for batch certificate generation
+
+    records, when provided, is the already-parsed CSV as a list of row
+    dicts (the enqueueing endpoint has usually just read the file for its
+    row count); passing it through avoids a second full parse here. When
+    omitted the task reads csv_path itself.
     """
     try:
         logger.info(f"Starting batch generation task for job {job_id}")
-        
-        # Get data from CSV
-        df = CSVService.read_csv(csv_path)
+
+        # Get data from CSV unless the caller already parsed it. Chunked
+        # reading keeps the peak at one DataFrame chunk plus the row dicts
+        # instead of a second whole-file DataFrame alongside them, and
+        # itertuples is an order of magnitude faster than iterrows.
+        if records is None:
+            records = []
+            columns = None
+            for chunk in CSVService.iter_csv_chunks(csv_path):
+                if columns is None:
+                    columns = list(chunk.columns)
+                records.extend(
+                    {col: str(val) for col, val in zip(columns, row)}
+                    for row in chunk.itertuples(index=False, name=None)
+                )
+            columns = columns or []
+        else:
+            columns = list(records[0].keys()) if records else []
+            records = [
+                {col: str(rec.get(col, "")) for col in columns}
+                for rec in records
+            ]
 
         mapping = mapping or {}
 
+        # Reconcile the enqueue-time estimate with the real row count now
+        # that the CSV is parsed. The newline scan can overcount (trailing
+        # blank lines, quoted fields with embedded newlines) and the job
+        # only goes terminal when processed_items reaches total_items, so
+        # an inflated total would pin it at "processing" forever. This task
+        # is the job's sole JobService writer, so the update can't race.
+        status = JobService.get_job_status(job_id)
+        if status and status.get("total_items") != len(records):
+            status["total_items"] = len(records)
+            JobService._save_status(job_id, status)
+
         normalized_columns = {
             AdvancedPlaceholderService._normalize_key(col): col
-            for col in df.columns
+            for col in columns
         }
 
         def resolve_column(column_name: Optional[str]) -> Optional[str]:
@@ -41,112 +173,102 @@ def generate_batch_task(job_id: str, template_path: str, csv_path: str, mapping:
                 logger.warning(
                     "Column '%s' from mapping not found. Available columns: %s",
                     column_name,
-                    list(df.columns)
+                    columns
                 )
             return resolved
 
-        name_column = resolve_column(mapping.get('name')) or df.columns[0]
-        if name_column not in df.columns:
+        name_column = resolve_column(mapping.get('name')) or (columns[0] if columns else None)
+        if name_column not in columns:
             JobService.update_progress(job_id, False, f"Name column '{name_column}' not found in CSV")
             return
 
-        # Update total items in job
-        # (Note: Job was created with estimated total, we can update if needed or just track progress)
-        
         # Find placeholder bounding box
-        placeholders = AdvancedPlaceholderService.detect_all_placeholders(template_path)
+        placeholders = AdvancedPlaceholderService.detect_all_placeholders_cached(template_path)
         # Look for the specific placeholder or fallback to NAME
         target_placeholder = placeholder_text.replace("{{", "").replace("}}", "")
         bbox = None
-        
+
         if target_placeholder in placeholders:
             bbox = placeholders[target_placeholder]
         elif "NAME" in placeholders:
             bbox = placeholders["NAME"]
-            
-        # Convert template to image if it's a PDF
-        if template_path.lower().endswith('.pdf'):
-            template_images = PDFService.pdf_to_images(template_path)
-            template_image = template_images[0]
-        else:
-            from PIL import Image
-            template_image = Image.open(template_path)
-            
+
         output_dir = os.path.join(settings.UPLOAD_DIR, "certificates", job_id)
         os.makedirs(output_dir, exist_ok=True)
-        
+
+        # Decode/rasterize the template once and publish the pixels through
+        # shared memory so no worker repeats the decode and only one copy of
+        # the base image lives in RAM.
+        template_image = _load_template_image(template_path)
+        if template_image.mode != 'RGB':
+            # Normalize up front so the in-place render path never has to
+            # mode-convert (which would allocate a fresh full page per row)
+            template_image = template_image.convert('RGB')
+        pixels = template_image.tobytes()
+        shm = shared_memory.SharedMemory(create=True, size=len(pixels))
+        shm.buf[:len(pixels)] = pixels
+        template_spec = (shm.name, template_image.mode, template_image.size)
+        del pixels, template_image
+
+        # Rendering is embarrassingly parallel and CPU-bound (PIL text
+        # rasterization + PNG encode), so fan rows out across one worker
+        # process per core. Progress updates stay here so JobService writes
+        # are single-writer.
+        rows = [
+            (idx, rec, name_column, output_dir)
+            for idx, rec in enumerate(records)
+        ]
+        workers = os.cpu_count() or 1
+        chunksize = max(1, len(rows) // (4 * workers))
+
         generated_files = []
-        
-        for idx, (_, row) in enumerate(df.iterrows()):
-            try:
-                row_dict = {col: str(row.get(col, "")) for col in df.columns}
-
-                name_value = row_dict.get(name_column, "").strip()
-                if not name_value:
-                    logger.warning(f"Row {idx} has empty name, skipping")
-                    JobService.update_progress(job_id, False, "Empty name", item_id=f"row_{idx}")
-                    continue
-
-                result_image = template_image.copy()
-                for placeholder_name, placeholder_info in placeholders.items():
-                    csv_column = normalized_columns.get(placeholder_name)
-
-                    if not csv_column and placeholder_info.get('raw_key'):
-                        raw_normalized = AdvancedPlaceholderService._normalize_key(placeholder_info['raw_key'])
-                        csv_column = normalized_columns.get(raw_normalized)
-
-                    if not csv_column:
-                        logger.info(
-                            "No matching CSV column for placeholder %s (available columns: %s)",
-                            placeholder_name,
-                            list(df.columns)
-                        )
-                        continue
-
-                    value = row_dict.get(csv_column, "").strip()
-                    if not value:
-                        logger.info(
-                            "Skipping placeholder %s: empty value in column '%s'",
-                            placeholder_name,
-                            csv_column
-                        )
-                        continue
-
-                    bbox_current = placeholder_info.get('bbox', {})
-                    if bbox_current:
-                        result_image = PDFService.render_name_on_image(
-                            result_image,
-                            value,
-                            bbox=bbox_current,
-                            center=True
-                        )
-
-                # Save certificate image
-                safe_name = "".join(c for c in name_value if c.isalnum() or c in (' ', '_', '-')).strip()
-                filename = f"certificate_{idx + 1}_{safe_name.replace(' ', '_')}.png"
-                output_path = os.path.join(output_dir, filename)
-                result_image.save(output_path, "PNG")
-                generated_files.append(output_path)
-                
-                # Update progress
-                JobService.update_progress(job_id, True)
-                
-            except Exception as e:
-                logger.error(f"Error generating certificate for row {idx}: {e}")
-                JobService.update_progress(job_id, False, str(e), item_id=name_value or f"row_{idx}")
-        
+
+        # Stream archive entries as renders complete instead of re-reading
+        # every PNG in a second pass once the loop is done; the zip write
+        # overlaps with rendering still in flight in the workers. The
+        # per-file PNGs stay on disk because the email-send path attaches
+        # certificates individually.
+        zip_path = os.path.join(settings.UPLOAD_DIR, "certificates", f"{job_id}.zip")
+        zf = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED, allowZip64=True)
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_render_worker,
+                initargs=(template_spec, placeholders, normalized_columns)
+            ) as executor:
+                for idx, name_value, output_path, error in executor.map(
+                    _render_row, rows, chunksize=chunksize
+                ):
+                    if error is None:
+                        zf.write(output_path, os.path.basename(output_path))
+                        generated_files.append(output_path)
+                        JobService.update_progress(job_id, True)
+                    elif error == "Empty name":
+                        logger.warning(f"Row {idx} has empty name, skipping")
+                        JobService.update_progress(job_id, False, "Empty name", item_id=f"row_{idx}")
+                    else:
+                        logger.error(f"Error generating certificate for row {idx}: {error}")
+                        JobService.update_progress(job_id, False, error, item_id=name_value or f"row_{idx}")
+        finally:
+            zf.close()
+            shm.close()
+            shm.unlink()
+
         if generated_files:
-            # Create ZIP
-            zip_path = os.path.join(settings.UPLOAD_DIR, "certificates", f"{job_id}.zip")
-            ZIPService.create_zip(generated_files, zip_path)
-            
             # Update job metadata with download URL
             status = JobService.get_job_status(job_id)
             status["download_url"] = f"/api/generate/download/{os.path.basename(zip_path)}"
             JobService._save_status(job_id, status)
-            
+        else:
+            # Nothing rendered; don't leave an empty archive behind
+            try:
+                os.remove(zip_path)
+            except OSError:
+                pass
+
         logger.info(f"Batch generation task completed for job {job_id}")
-        
+
     except Exception as e:
         logger.error(f"Fatal error in batch generation task: {e}")
         # Mark remaining items as failed? Or just log fatal error
@@ -5,6 +5,7 @@ Tracks uploaded files and their timestamps in a JSON metadata file.
 """
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict
@@ -27,6 +28,11 @@ class UploadMetadata:
             metadata_file: Path to metadata JSON file
         """
         self.metadata_file = Path(metadata_file)
+        # Parsed-JSON cache keyed by the file's mtime so the hot read path
+        # (every /batch submission) only pays open+parse when the file has
+        # actually changed on disk.
+        self._cache_mtime_ns: Optional[int] = None
+        self._cache_data: Optional[Dict] = None
         self._ensure_metadata_file()
     
     def _ensure_metadata_file(self):
@@ -45,19 +51,30 @@ class UploadMetadata:
             logger.info(f"Created metadata file: {self.metadata_file}")
     
     def _read_metadata(self) -> Dict:
-        """Read metadata from file"""
+        """Read metadata from file, reparsing only when its mtime changes"""
         try:
+            mtime_ns = os.stat(self.metadata_file).st_mtime_ns
+            if self._cache_data is not None and mtime_ns == self._cache_mtime_ns:
+                return self._cache_data
             with open(self.metadata_file, 'r') as f:
-                return json.load(f)
+                data = json.load(f)
+            self._cache_mtime_ns = mtime_ns
+            self._cache_data = data
+            return data
         except Exception as e:
             logger.error(f"Error reading metadata: {e}")
             return self._get_default_data()
-    
+
     def _write_metadata(self, data: Dict):
         """Write metadata to file"""
         try:
             with open(self.metadata_file, 'w') as f:
                 json.dump(data, f, indent=2)
+            # Writers go through _read_metadata first, so keep the cache
+            # coherent with what just hit disk instead of forcing the next
+            # reader to reparse our own write.
+            self._cache_mtime_ns = os.stat(self.metadata_file).st_mtime_ns
+            self._cache_data = data
         except Exception as e:
             logger.error(f"Error writing metadata: {e}")
             raise
@@ -168,9 +185,10 @@ class UploadMetadata:
         Returns:
             Dict with 'template' and 'csv' keys
         """
+        data = self._read_metadata()
         return {
-            "template": self.get_latest_template(),
-            "csv": self.get_latest_csv()
+            "template": data.get("last_template"),
+            "csv": data.get("last_csv")
         }
     
     def validate_file_exists(self, file_path: str) -> bool:
@@ -185,3 +203,14 @@ class UploadMetadata:
         """
         return Path(file_path).exists()
 
+
+@lru_cache(maxsize=1)
+def get_upload_metadata() -> UploadMetadata:
+    """Process-wide UploadMetadata instance.
+
+    Constructing UploadMetadata stats (and possibly creates) the metadata
+    file; request handlers share this singleton instead of repeating that
+    per call.
+    """
+    return UploadMetadata()
+
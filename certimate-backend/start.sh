@@ -5,5 +5,7 @@
 echo "🚀 Starting CertiMate Backend..."
 
 # Run the server using venv's Python directly
-./venv/bin/python -m uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+# uvloop + httptools cut per-request event-loop/HTTP-parse overhead and
+# enable Starlette's sendfile path for file downloads
+./venv/bin/python -m uvicorn app.main:app --reload --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
 